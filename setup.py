@@ -1,18 +1,34 @@
 """Setup project."""
 
+import functools
 import os
-import os
+import re
 import shutil
 import subprocess
-import subprocess
 import sys
+import tempfile
+import threading
 import glob
 import zipfile
 from configparser import ConfigParser
 
-import boto3
-import yaml
-from dotenv import load_dotenv
+# boto3, yaml and dotenv are imported where used, so the fast-fail
+# checks do not pay for loading them
+
+# Sessions and caller identities are shared across setup steps
+_SESSION_CACHE = {}
+_IDENTITY_CACHE = {}
+_SESSION_LOCK = threading.Lock()
+
+# Parsed AWS INI files, keyed by path and reused while mtime and size match
+_AWS_FILE_CACHE = {}
+
+# Key formats checked locally, so typos fail before any call to AWS
+_AKID_RE = re.compile(r"^(AKIA|ASIA)[0-9A-Z]{16}$")
+_SECRET_RE = re.compile(r"^[A-Za-z0-9/+=]{40}$")
+
+# Any INI section header line, e.g. "[profile name]"
+_SECTION_RE = re.compile(r"^\s*\[[^\]]+\]")
 
 
 def check_virtual_env():
@@ -36,6 +52,8 @@ def install_requirements(requirements_path):
 
 def get_env():
     """Load environment variable."""
+    from dotenv import load_dotenv
+
     load_dotenv()
     ENVIRONMENT = os.getenv("ENVIRONMENT")
     if not ENVIRONMENT:
@@ -44,15 +62,24 @@ def get_env():
     print(f"ENVIRONMENT = {ENVIRONMENT}")
 
 
+def _yaml_loader():
+    """Return the libyaml safe loader, falling back to the pure-Python one."""
+    import yaml
+
+    return getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
 def load_setup_config(file_path):
     """Read setup configs."""
     if not os.path.exists(file_path):
         print(f"Could not find {file_path}.")
         exit(1)
 
+    import yaml
+
     with open(file_path, "r") as file:
         return (
-            yaml.safe_load(file)
+            yaml.load(file.read(), Loader=_yaml_loader())
             if file_path.endswith((".yml", ".yaml"))
             else exit("Error: Use a YAML config file.")
         )
@@ -64,8 +91,10 @@ def check_aws_credentials(credentials_path):
         print(f"AWS credentials file {credentials_path} not found.")
         exit(1)
 
+    import yaml
+
     with open(credentials_path, "r") as file:
-        credentials = yaml.safe_load(file)
+        credentials = yaml.load(file.read(), Loader=_yaml_loader())
 
     aws_access_key = credentials.get("aws_access_key_id")
     aws_secret_key = credentials.get("aws_secret_access_key")
@@ -74,14 +103,40 @@ def check_aws_credentials(credentials_path):
         print("Error: AWS credentials missing in config file.")
         exit(1)
 
+    if not _AKID_RE.match(str(aws_access_key)) or not _SECRET_RE.match(
+        str(aws_secret_key)
+    ):
+        print("Error: AWS credentials in config file are not in a valid format.")
+        exit(1)
+
     print("AWS credentials found.")
     return aws_access_key, aws_secret_key
 
 
+def get_session(profile_name=None):
+    """Return a cached boto3 session for the profile."""
+    import boto3
+
+    with _SESSION_LOCK:
+        if profile_name not in _SESSION_CACHE:
+            _SESSION_CACHE[profile_name] = boto3.Session(profile_name=profile_name)
+        return _SESSION_CACHE[profile_name]
+
+
+def get_caller_identity(session):
+    """Return the cached STS caller identity for the session's profile."""
+    profile_name = session.profile_name
+    if profile_name not in _IDENTITY_CACHE:
+        _IDENTITY_CACHE[profile_name] = session.client("sts").get_caller_identity()
+    return _IDENTITY_CACHE[profile_name]
+
+
+@functools.lru_cache(maxsize=1)
 def list_aws_profiles():
     """List current AWS profiles configured."""
-    session = boto3.Session()
-    return session.available_profiles
+    import botocore.session
+
+    return botocore.session.Session().available_profiles
 
 
 def aws_profile_exists(profile_name):
@@ -89,28 +144,149 @@ def aws_profile_exists(profile_name):
     return profile_name in list_aws_profiles()
 
 
-def create_aws_profile(profile_name, aws_access_key, aws_secret_key, aws_region):
-    """Create AWS profile."""
-    credentials_file = os.path.expanduser("~/.aws/credentials")
+def _aws_credentials_file():
+    """Return the shared credentials file path, resolved the way botocore does."""
+    return os.path.expanduser(
+        os.environ.get("AWS_SHARED_CREDENTIALS_FILE", "~/.aws/credentials")
+    )
+
+
+def _aws_config_file():
+    """Return the AWS config file path, resolved the way botocore does."""
+    return os.path.expanduser(os.environ.get("AWS_CONFIG_FILE", "~/.aws/config"))
+
+
+def _config_section(profile_name):
+    """Return the AWS config file section name for a profile."""
+    return "default" if profile_name == "default" else f"profile {profile_name}"
+
+
+def _cache_aws_file(file_path, content, config):
+    """Remember the parsed contents of an AWS INI file at its current mtime."""
+    stat = os.stat(file_path)
+    _AWS_FILE_CACHE[file_path] = ((stat.st_mtime_ns, stat.st_size), content, config)
+
+
+def _read_aws_file(file_path):
+    """Return the contents and parsed config of an AWS INI file."""
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None, ConfigParser()
+
+    cached = _AWS_FILE_CACHE.get(file_path)
+    if cached and cached[0] == (stat.st_mtime_ns, stat.st_size):
+        return cached[1], cached[2]
+
+    with open(file_path, "r") as file:
+        content = file.read()
     config = ConfigParser()
-    if os.path.exists(credentials_file):
-        config.read(credentials_file)
+    config.read_string(content, source=file_path)
+    _cache_aws_file(file_path, content, config)
+    return content, config
+
+
+def _set_ini_values(content, section, values):
+    """Set keys under an INI section, leaving every other line as it was."""
+    lines = content.splitlines(keepends=True)
+    if lines and not lines[-1].endswith("\n"):
+        lines[-1] += "\n"
+
+    header_re = re.compile(r"^\s*\[\s*" + re.escape(section) + r"\s*\]\s*$")
+    start = next((i for i, line in enumerate(lines) if header_re.match(line)), None)
+    if start is None:
+        if lines:
+            lines.append("\n")
+        lines.append(f"[{section}]\n")
+        lines.extend(f"{key} = {value}\n" for key, value in values.items())
+        return "".join(lines)
+
+    end = next(
+        (i for i in range(start + 1, len(lines)) if _SECTION_RE.match(lines[i])),
+        len(lines),
+    )
+    for key, value in values.items():
+        key_re = re.compile(r"^" + re.escape(key) + r"\s*[=:]\s*(.*?)\s*$")
+        index = next((i for i in range(start + 1, end) if key_re.match(lines[i])), None)
+        if index is not None:
+            if key_re.match(lines[index]).group(1) != value:
+                lines[index] = f"{key} = {value}\n"
+            continue
+        # New keys go after the section's last non-blank line
+        index = end
+        while index > start + 1 and not lines[index - 1].strip():
+            index -= 1
+        lines.insert(index, f"{key} = {value}\n")
+        end += 1
+    return "".join(lines)
+
+
+def _update_aws_file(file_path, section, values):
+    """Set values under a section of an AWS INI file, creating it if needed."""
+    # Write through symlinks (e.g. dotfile managers), the swap below would
+    # otherwise replace the link itself with a regular file
+    file_path = os.path.realpath(file_path)
+    existing, _ = _read_aws_file(file_path)
+
+    # Only the affected lines change, comments and layout are kept
+    content = _set_ini_values(existing or "", section, values)
+    if content == existing:
+        return  # Nothing changed, keep the file as is
+
+    # Write to a temporary file and swap it in, so a crash never leaves a
+    # partially written credentials file behind
+    # The temporary file is created 0600 and only takes the original file's
+    # mode before the keys are written, so they are never readable by others
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path))
+    try:
+        if existing is not None:
+            shutil.copymode(file_path, tmp_path)
+        with os.fdopen(fd, "w") as file:
+            file.write(content)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
 
-    if not config.has_section(profile_name):
-        config.add_section(profile_name)
+    config = ConfigParser()
+    config.read_string(content, source=file_path)
+    _cache_aws_file(file_path, content, config)
+
+
+def _write_aws_profile(
+    profile_name, aws_access_key=None, aws_secret_key=None, aws_region=None
+):
+    """Write profile credentials and region directly, without the AWS CLI."""
+    if aws_access_key and aws_secret_key:
+        _update_aws_file(
+            _aws_credentials_file(),
+            profile_name,
+            {
+                "aws_access_key_id": aws_access_key,
+                "aws_secret_access_key": aws_secret_key,
+            },
+        )
+    if aws_region:
+        _update_aws_file(
+            _aws_config_file(),
+            _config_section(profile_name),
+            {"region": aws_region},
+        )
 
-    config.set(profile_name, "aws_access_key_id", aws_access_key)
-    config.set(profile_name, "aws_secret_access_key", aws_secret_key)
 
-    with open(credentials_file, "w") as file:
-        config.write(file)
+def _read_profile_region(profile_name):
+    """Read the profile region from the AWS config file, without the AWS CLI."""
+    _, config = _read_aws_file(_aws_config_file())
+    return config.get(_config_section(profile_name), "region", fallback=None)
 
-    print(f"AWS profile '{profile_name}' created and stored {credentials_file}.")
 
-    # Ensure region is set
-    subprocess.run(
-        ["aws", "configure", "set", "region", aws_region, "--profile", profile_name],
-        check=True,
+def create_aws_profile(profile_name, aws_access_key, aws_secret_key, aws_region):
+    """Create AWS profile."""
+    _write_aws_profile(profile_name, aws_access_key, aws_secret_key, aws_region)
+    list_aws_profiles.cache_clear()
+    print(
+        f"AWS profile '{profile_name}' created and stored in {_aws_credentials_file()}."
     )
     print(f"AWS profile '{profile_name}' region set to {aws_region}.")
 
@@ -121,52 +297,38 @@ def configure_aws_profile(profile_name, aws_access_key, aws_secret_key, aws_regi
         print(f"AWS profile '{profile_name}' already exists. Ensuring region is set.")
 
         # Check if the profile has a region set
-        result = subprocess.run(
-            ["aws", "configure", "get", "region", "--profile", profile_name],
-            capture_output=True,
-            text=True,
-        )
-        current_region = result.stdout.strip()
+        current_region = _read_profile_region(profile_name)
 
         if not current_region:
             print(
                 f"Profile '{profile_name}' is missing a region. Setting to {aws_region}."
             )
-            subprocess.run(
-                [
-                    "aws",
-                    "configure",
-                    "set",
-                    "region",
-                    aws_region,
-                    "--profile",
-                    profile_name,
-                ],
-                check=True,
-            )
+            _write_aws_profile(profile_name, aws_region=aws_region)
 
-        return boto3.Session(profile_name=profile_name)
+        return get_session(profile_name)
 
     print(f"AWS profile '{profile_name}' does not exist. Creating new profile.")
     create_aws_profile(profile_name, aws_access_key, aws_secret_key, aws_region)
-    return boto3.Session(profile_name=profile_name)
+    return get_session(profile_name)
 
 
 def get_aws_details(session):
     """Get session details."""
-    sts_client = session.client("sts")
-    identity = sts_client.get_caller_identity()
+    from botocore.exceptions import BotoCoreError, ClientError
+
+    try:
+        identity = get_caller_identity(session)
+    except (BotoCoreError, ClientError) as e:
+        print(f"Error: Could not validate AWS profile '{session.profile_name}': {e}")
+        exit(1)
     account_id = identity["Account"]
     arn = identity["Arn"]
     user = arn.split("/")[-1]
 
     # Ensure the correct region is used
-    result = subprocess.run(
-        ["aws", "configure", "get", "region", "--profile", session.profile_name],
-        capture_output=True,
-        text=True,
+    region = (
+        session.region_name or _read_profile_region(session.profile_name) or "us-east-1"
     )
-    region = result.stdout.strip() or "us-east-1"
 
     print(f"Account ID: {account_id}, Region: {region}, ARN: {arn}, User: {user}")
     return {
@@ -209,7 +371,9 @@ if __name__ == "__main__":
     # Check loaded config
     print("Loaded setup config:", setup_config)
 
-    requirements_path = setup_config.get("project_files", {}).get("requirements_path")
+    project_files = setup_config.get("project_files", {})
+    aws_resources = setup_config.get("aws_resources", {})
+    requirements_path = project_files.get("requirements_path")
 
     if requirements_path:
         install_requirements(requirements_path)
@@ -220,11 +384,8 @@ if __name__ == "__main__":
     aws_credentials_path = setup_config.get("aws_credentials")
     aws_profile_name = setup_config.get("aws_profile_name")
     aws_region = setup_config.get("aws_region") or "us-east-1"  # default to us-est-1
-    requirements_path = setup_config["project_files"]["requirements_path"]
 
     # Print the loaded project files and aws resources to verify
-    project_files = setup_config.get("project_files", {})
-    aws_resources = setup_config.get("aws_resources", {})
     print("Loaded project_files:", project_files)
     print("Loaded aws_resources:", aws_resources)
 
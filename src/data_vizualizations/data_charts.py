@@ -1,47 +1,77 @@
 """Charts for dynamoDB data."""
+import argparse
+import os
 import random
 import time
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 
 import boto3
 import matplotlib.dates as mdates
 import matplotlib.pyplot as plt
-import matplotlib.pyplot as plt
 import numpy as np
-import pytz
 from boto3.dynamodb.conditions import Key
+from botocore.config import Config
 from botocore.exceptions import NoCredentialsError, PartialCredentialsError, ClientError
 
-PST = pytz.timezone("US/Pacific")
 TABLE_NAME = "project-data-pipeline-table"
 AWS_PROFILE = "data-pipeline-local-profile"
 REGION = "us-east-1"
+SCAN_SEGMENTS = 8
+# Enough pooled keep-alive connections for the parallel scans and queries
+BOTO_CONFIG = Config(
+    max_pool_connections=32,
+    tcp_keepalive=True,
+    retries={"mode": "adaptive", "max_attempts": 4},
+)
+
+# Parse arguments before connecting, so --help and bad flags need no AWS access
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--save", metavar="DIR", help="save the charts as PNGs in DIR")
+args = parser.parse_args()
 
 try:
     session = boto3.Session(profile_name=AWS_PROFILE, region_name=REGION)
-    dynamodb = session.resource("dynamodb")
+    dynamodb = session.resource("dynamodb", config=BOTO_CONFIG)
     table = dynamodb.Table(TABLE_NAME)
-    scan_response = table.scan()
+    table.load()  # DescribeTable, checks credentials and table without reading data
 except (NoCredentialsError, PartialCredentialsError) as e:
     print(f"Error: AWS credentials not found or incomplete. {e}")
     exit(1)
 except Exception as e:
-    print(f"Unexpected error deleting old data: {e}")
+    print(f"Unexpected error connecting to DynamoDB: {e}")
     exit(1)
 
 
+def count_segment_sites(segment):
+    """Count items per site in one segment of a parallel table scan."""
+    site_counts = defaultdict(int)
+    paginator = dynamodb.meta.client.get_paginator("scan")
+    for page in paginator.paginate(
+        TableName=TABLE_NAME,
+        ProjectionExpression="site_id",
+        Segment=segment,
+        TotalSegments=SCAN_SEGMENTS,
+    ):
+        for item in page.get("Items", []):
+            site_counts[item["site_id"]] += 1
+    return site_counts
+
+
 def get_top_sites():
     """Get top 5 sites."""
     try:
-        response = table.scan(ProjectionExpression="site_id")
+        # Scan all pages, with the table split into segments scanned in parallel
         site_counts = defaultdict(int)
-        for item in response.get("Items", []):
-            site_counts[item["site_id"]] += 1
+        with ThreadPoolExecutor(max_workers=SCAN_SEGMENTS) as executor:
+            for segment_counts in executor.map(
+                count_segment_sites, range(SCAN_SEGMENTS)
+            ):
+                for site, count in segment_counts.items():
+                    site_counts[site] += count
         print("Returning top 5 sites")
-        return sorted(site_counts.keys(), key=lambda x: site_counts[x], reverse=True)[
-            :10
-        ]
+        return sorted(site_counts.keys(), key=lambda x: (-site_counts[x], x))[:10]
     except ClientError as e:
         print(f"Error scanning DynamoDB: {e}")
         return []
@@ -62,19 +92,31 @@ def query_recent_site_data(site_id):
         return []
 
 
-def plot_generated_vs_consumed(sites):
+def fetch_all_recent(sites):
+    """Get last 24 hours data for all sites, querying them in parallel."""
+    if not sites:
+        return {}
+    # Queries are network-bound, so threads overlap the round trips
+    with ThreadPoolExecutor(max_workers=len(sites)) as executor:
+        return dict(zip(sites, executor.map(query_recent_site_data, sites)))
+
+
+def show_or_save(fig, outpath=None):
+    """Show the figure, or save it to outpath and close it."""
+    if outpath:
+        fig.savefig(outpath, dpi=100, bbox_inches="tight")
+        plt.close(fig)
+        print(f"Saved chart to {outpath}")
+    else:
+        plt.show()
+
+
+def plot_generated_vs_consumed(site_data_by_site, outpath=None):
     """Plot generated vs consumed energy for the top 10 sites (last 24 hours)."""
-    site_energy = {site: {"generated": 0, "consumed": 0} for site in sites}
-    timestamps_pst = []  # Store all timestamps to determine min/max
+    site_energy = {site: {"generated": 0, "consumed": 0} for site in site_data_by_site}
 
-    for site in sites:
-        site_data = query_recent_site_data(site)
+    for site, site_data in site_data_by_site.items():
         for item in site_data:
-            timestamp_utc = int(item["timestamp"])
-            timestamp_utc = datetime.fromtimestamp(timestamp_utc, timezone.utc)
-            timestamp_pst = timestamp_utc.astimezone(PST)
-            timestamps_pst.append(timestamp_pst)
-
             if not item.get("anomaly"):
                 site_energy[site]["generated"] += float(item["energy_generated_kwh"])
                 site_energy[site]["consumed"] += float(item["energy_consumed_kwh"])
@@ -88,7 +130,7 @@ def plot_generated_vs_consumed(sites):
     x = np.arange(len(x_labels))
     width = 0.35
 
-    plt.figure(figsize=(12, 6))
+    fig = plt.figure(figsize=(12, 6))
     plt.bar(x - width / 2, energy_generated, width, label="Generated", color="green")
     plt.bar(x + width / 2, energy_consumed, width, label="Consumed", color="orange")
 
@@ -98,14 +140,13 @@ def plot_generated_vs_consumed(sites):
     plt.xticks(x, x_labels, rotation=90, ha="right")
     plt.legend()
     plt.tight_layout()
-    plt.show()
+    show_or_save(fig, outpath)
 
 
-def plot_anomalies_per_site(sites):
+def plot_anomalies_per_site(site_data_by_site, outpath=None):
     """Chart for anomalies over last 24 hours."""
     anomaly_counts = defaultdict(int)
-    for site in sites:
-        site_data = query_recent_site_data(site)
+    for site, site_data in site_data_by_site.items():
         for item in site_data:
             if item.get("anomaly"):
                 anomaly_counts[site] += 1
@@ -114,45 +155,53 @@ def plot_anomalies_per_site(sites):
         return
     x_labels = sorted(anomaly_counts.keys())
     y_values = [anomaly_counts[s] for s in x_labels]
-    plt.figure(figsize=(8, 5))
+    fig = plt.figure(figsize=(8, 5))
     plt.plot(x_labels, y_values, marker="o", color="crimson", linewidth=2)
     plt.xlabel("Site ID")
     plt.ylabel("Anomaly Count")
     plt.title(f"Anomaly Distribution Over Sites (Last 24 Hours)")
     plt.xticks(rotation=90, ha="right")
     plt.tight_layout()
-    plt.show()
+    show_or_save(fig, outpath)
 
 
-def plot_energy_trends(site_id, site_data):
+def plot_energy_trends(site_id, site_data, outpath=None):
     """Energy trends for a site over the last 3 hours, excluding anomalies."""
-    now_utc, cutoff_time = datetime.now(timezone.utc), datetime.now(
-        timezone.utc
-    ) - timedelta(hours=3)
-
-    valid_data = [
-        (
-            int(item["timestamp"]),
-            float(item["energy_generated_kwh"]),
-            float(item["energy_consumed_kwh"]),
-        )
-        for item in site_data
-        if item.get("site_id") == site_id
-        and not item.get("anomaly")
-        and item["energy_generated_kwh"] >= 0
-        and item["energy_consumed_kwh"] >= 0
-        and datetime.fromtimestamp(int(item["timestamp"]), timezone.utc) >= cutoff_time
-    ]
+    cutoff_time = datetime.now(timezone.utc) - timedelta(hours=3)
+
+    site_records = np.array(
+        [
+            (
+                int(item["timestamp"]),
+                float(item["energy_generated_kwh"]),
+                float(item["energy_consumed_kwh"]),
+                bool(item.get("anomaly")),
+            )
+            for item in site_data
+            if item.get("site_id") == site_id
+        ],
+        dtype=[("ts", "i8"), ("generated", "f8"), ("consumed", "f8"), ("anomaly", "?")],
+    )
+    # Filter all records in one vectorized pass instead of per-row checks
+    valid = (
+        ~site_records["anomaly"]
+        & (site_records["generated"] >= 0)
+        & (site_records["consumed"] >= 0)
+        & (site_records["ts"] >= cutoff_time.timestamp())
+    )
+    valid_data = np.sort(site_records[valid], order=["ts", "generated", "consumed"])
 
-    if not valid_data:
+    if not len(valid_data):
         return print(f"No valid data for site '{site_id}' in the last 3 hours.")
 
-    timestamps, energy_generated, energy_consumed = zip(*sorted(valid_data))
+    energy_generated = valid_data["generated"]
+    energy_consumed = valid_data["consumed"]
     readable_times = [
-        datetime.fromtimestamp(ts, timezone.utc).strftime("%H:%M") for ts in timestamps
+        datetime.fromtimestamp(ts, timezone.utc).strftime("%H:%M")
+        for ts in valid_data["ts"].tolist()
     ]
 
-    plt.figure(figsize=(12, 6))
+    fig = plt.figure(figsize=(12, 6))
     plt.plot(
         readable_times,
         energy_generated,
@@ -174,17 +223,30 @@ def plot_energy_trends(site_id, site_data):
     plt.legend(), plt.xticks(rotation=45, ha="right"), plt.grid(
         True, linestyle="--", alpha=0.5
     )
-    plt.tight_layout(), plt.show()
+    plt.tight_layout()
+    show_or_save(fig, outpath)
+
+
+def chart_path(name):
+    """Output path for a chart, or None to show it."""
+    return os.path.join(args.save, f"{name}.png") if args.save else None
+
 
+if args.save:
+    # Headless rendering, no GUI event loop needed just to write files
+    plt.switch_backend("Agg")
+    os.makedirs(args.save, exist_ok=True)
 
 top_ten_sites = get_top_sites()
 print(top_ten_sites)
-site_data = query_recent_site_data(top_ten_sites[1])
+# query each site once and share the data across all charts
+site_data_by_site = fetch_all_recent(top_ten_sites)
 # generated vs consumed
-plot_generated_vs_consumed(top_ten_sites)
+plot_generated_vs_consumed(site_data_by_site, chart_path("generated_vs_consumed"))
 # anomalies
-plot_anomalies_per_site(top_ten_sites)
+plot_anomalies_per_site(site_data_by_site, chart_path("anomalies_per_site"))
 # energy trend
 site_id = top_ten_sites[1]
-site_data = query_recent_site_data(site_id)
-plot_energy_trends(site_id, site_data)
+plot_energy_trends(
+    site_id, site_data_by_site[site_id], chart_path(f"energy_trends_{site_id}")
+)
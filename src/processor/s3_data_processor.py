@@ -1,11 +1,19 @@
 """Lambda - to process s3 data and insert into DynamoDB table."""
 
-import json
 import boto3
 import decimal
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from botocore.config import Config
 from botocore.exceptions import BotoCoreError, ClientError
+from dotenv import load_dotenv
+
+try:
+    from orjson import loads as json_loads  # C parser, reads bytes directly
+except ImportError:
+    from json import loads as json_loads
 
 
 def is_running_in_lambda():
@@ -13,8 +21,10 @@ def is_running_in_lambda():
     return "AWS_LAMBDA_FUNCTION_NAME" in os.environ
 
 
-# Moto for local testing only
-if not is_running_in_lambda():
+# Moto only for local runs opted into with ENVIRONMENT=LOCAL in .env, as in the
+# simulator, tests start their own mock
+load_dotenv()
+if not is_running_in_lambda() and os.getenv("ENVIRONMENT", "AWS").upper() == "LOCAL":
     from moto import mock_aws
 
     mock_aws().start()
@@ -24,9 +34,26 @@ if not is_running_in_lambda():
 S3_BUCKET_NAME = "project-data-pipeline-data-bucket"
 DYNAMODB_TABLE_NAME = "project-data-pipeline-table"
 
-# Initialize AWS clients
-dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
-s3_client = boto3.client("s3", region_name="us-east-1")
+# Upper bound on S3 objects fetched concurrently per event
+MAX_S3_WORKERS = 16
+
+# Net energy is stored rounded to 2 decimal places
+NET_ENERGY_PRECISION = decimal.Decimal("0.01")
+
+# Fields read from each simulator record, fetched in a single call
+RECORD_FIELDS = itemgetter(
+    "site_id", "timestamp", "energy_generated_kwh", "energy_consumed_kwh"
+)
+
+# Initialize AWS clients once per container, reusing keep-alive connections
+BOTO_CONFIG = Config(
+    max_pool_connections=32,
+    tcp_keepalive=True,
+    retries={"mode": "adaptive", "max_attempts": 4},
+)
+dynamodb = boto3.resource("dynamodb", region_name="us-east-1", config=BOTO_CONFIG)
+s3_client = boto3.client("s3", region_name="us-east-1", config=BOTO_CONFIG)
+table = dynamodb.Table(DYNAMODB_TABLE_NAME)
 
 # Logging setup
 logging.basicConfig(
@@ -36,25 +63,62 @@ logging.basicConfig(
 
 def process_s3_event(bucket_name, object_key):
     """Process an S3 event by reading JSON data and storing it in DynamoDB."""
+    store_s3_file(bucket_name, object_key, read_s3_file(bucket_name, object_key))
+
+
+def store_s3_file(bucket_name, object_key, file_content):
+    """Store the records of a JSON file read from S3 in DynamoDB."""
     try:
         logging.info(f"Processing file {object_key} from bucket {bucket_name}")
 
-        file_content = read_s3_file(bucket_name, object_key)
         if file_content:
-            for single_record in file_content:
-                store_in_dynamodb(single_record, object_key)
+            # Buffers puts into BatchWriteItem calls of up to 25 items, one
+            # writer per file so a failed flush only affects that file
+            with table.batch_writer(
+                overwrite_by_pkeys=["site_id", "timestamp"]
+            ) as batch:
+                failed_puts = sum(
+                    not store_in_dynamodb(batch, single_record, object_key)
+                    for single_record in file_content
+                )
+            # A failed put drops the batch it flushed, so only report the
+            # file as stored when every put went through
+            if failed_puts:
+                logging.error(
+                    f"Some records from {object_key} were not stored in DynamoDB."
+                )
+            else:
+                logging.info(
+                    f"Stored {len(file_content)} records from {object_key} in DynamoDB."
+                )
 
     except Exception as e:
         logging.error(f"Failed to process S3 file {object_key}: {e}")
 
 
+def get_s3_object(record):
+    """Return the (bucket, key) an S3 event record refers to."""
+    s3 = record["s3"]
+    return s3["bucket"]["name"], s3["object"]["key"]
+
+
 def lambda_handler(event, context):
     """AWS Lambda entry point triggered by S3 events."""
     try:
-        for record in event["Records"]:
-            bucket_name = record["s3"]["bucket"]["name"]
-            object_key = record["s3"]["object"]["key"]
-            process_s3_event(bucket_name, object_key)
+        # Duplicate notifications for the same object are fetched only once
+        s3_objects = list(dict.fromkeys(get_s3_object(r) for r in event["Records"]))
+        if not s3_objects:
+            return
+
+        # S3 reads are latency-bound, so fetch them concurrently. map yields
+        # them in event order, so a later file still wins on duplicate keys
+        workers = min(MAX_S3_WORKERS, len(s3_objects))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            file_contents = executor.map(read_s3_file, *zip(*s3_objects))
+            for (bucket_name, object_key), file_content in zip(
+                s3_objects, file_contents
+            ):
+                store_s3_file(bucket_name, object_key, file_content)
 
     except KeyError as e:
         logging.error(f"Event format error: {e}")
@@ -66,8 +130,7 @@ def read_s3_file(bucket, object_key):
     """Retrieve a JSON file from S3 and return the parsed content."""
     try:
         response = s3_client.get_object(Bucket=bucket, Key=object_key)
-        file_content = response["Body"].read().decode("utf-8")
-        return json.loads(file_content)
+        return json_loads(response["Body"].read())
     except s3_client.exceptions.NoSuchKey:
         logging.error(f"Failed to read S3 file {object_key}: No such key exists.")
     except Exception as e:
@@ -75,35 +138,31 @@ def read_s3_file(bucket, object_key):
     return None
 
 
-def store_in_dynamodb(record, file_name):
-    """Insert a single JSON record into DynamoDB."""
+def format_record(record):
+    """Format a single JSON record as a DynamoDB item, flagging anomalies."""
+    site_id, timestamp, generated, consumed = RECORD_FIELDS(record)
+    generated_kwh = decimal.Decimal(str(generated))
+    consumed_kwh = decimal.Decimal(str(consumed))
+    anomaly = generated < 0 or consumed < 0
+    formatted_data = {
+        "site_id": site_id,
+        "timestamp": timestamp,
+        "energy_generated_kwh": generated_kwh,
+        "energy_consumed_kwh": consumed_kwh,
+        # Exact decimal subtraction, no float artifacts to round away
+        "net_energy_kwh": (generated_kwh - consumed_kwh).quantize(NET_ENERGY_PRECISION),
+        "anomaly": anomaly,
+    }
+    if anomaly:
+        logging.warning(f"Anomaly detected in record: {formatted_data}")
+    return formatted_data
+
+
+def store_in_dynamodb(batch, record, file_name):
+    """Queue a single JSON record on a DynamoDB batch writer, returning success."""
     try:
-        table = dynamodb.Table(
-            DYNAMODB_TABLE_NAME
-        )  # Ensure table reference is inside function scope
-        formatted_data = {
-            "site_id": record["site_id"],
-            "timestamp": record["timestamp"],
-            "energy_generated_kwh": decimal.Decimal(
-                str(record["energy_generated_kwh"])
-            ),
-            "energy_consumed_kwh": decimal.Decimal(str(record["energy_consumed_kwh"])),
-            "net_energy_kwh": decimal.Decimal(
-                str(
-                    round(
-                        record["energy_generated_kwh"] - record["energy_consumed_kwh"],
-                        2,
-                    )
-                )
-            ),
-            "anomaly": bool(
-                record["energy_generated_kwh"] < 0 or record["energy_consumed_kwh"] < 0
-            ),
-        }
-        if formatted_data["anomaly"]:
-            logging.warning(f"Anomaly detected in record: {formatted_data}")
-        table.put_item(Item=formatted_data)
-        logging.info(f"Successfully stored record from {file_name} into DynamoDB.")
-
+        batch.put_item(Item=format_record(record))
+        return True
     except (BotoCoreError, ClientError) as e:
         logging.error(f"Failed to store data in DynamoDB for {file_name}: {e}")
+        return False
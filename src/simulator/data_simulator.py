@@ -6,21 +6,23 @@ import os
 import random
 import signal
 import sys
-import time
+import threading
 from datetime import datetime, timezone
 
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from dotenv import load_dotenv
 
+try:
+    import orjson  # C encoder, produces bytes directly
+except ImportError:
+    orjson = None
+
 
 def is_running_in_lambda():
     """Check if running in AWS Lambda environment."""
-    try:
-        boto3.client("sts").get_caller_identity()  # AWS check
-        return "AWS_LAMBDA_FUNCTION_NAME" in os.environ
-    except:
-        return False
+    return "AWS_LAMBDA_FUNCTION_NAME" in os.environ
 
 
 # Keep Moto for local testing only
@@ -31,11 +33,73 @@ if not is_running_in_lambda():
 load_dotenv()
 TIMESTAMP_FORMAT = "%Y_%m_%d_%H_%M_%S"
 AWS_BUCKET_NAME = "project-data-pipeline-data-bucket"
+SITE_IDS = tuple(f"SITECA{site_number:03d}" for site_number in range(1, 101))
 
 # Define environment (AWS or Local)
 ENVIRONMENT = os.getenv("ENVIRONMENT", "AWS").upper()
 USE_MOCK = ENVIRONMENT == "LOCAL"  # Use mock S3 for local testing
 
+
+# Reuse keep-alive connections and back off adaptively on throttling
+BOTO_CONFIG = Config(
+    tcp_keepalive=True, retries={"mode": "adaptive", "max_attempts": 4}
+)
+
+# Guards the shared S3 clients and the shared Moto mock
+_S3_LOCK = threading.Lock()
+
+# S3 clients shared by every S3Utils instance, keyed by mock mode
+_S3_CLIENTS = {}
+
+# Moto mock shared by every mock S3Utils, running while any of them uses it
+_MOCK_S3 = None
+_MOCK_USERS = 0
+_MOCK_BUCKETS = set()
+
+
+def get_s3_client(mock=USE_MOCK):
+    """Return the shared S3 client, creating it on first use."""
+    with _S3_LOCK:
+        if mock not in _S3_CLIENTS:
+            if mock:
+                _S3_CLIENTS[mock] = boto3.client(
+                    "s3", region_name="us-east-1", config=BOTO_CONFIG
+                )
+            else:
+                # Use IAM role, no profile
+                _S3_CLIENTS[mock] = boto3.client("s3", config=BOTO_CONFIG)
+        return _S3_CLIENTS[mock]
+
+
+def start_mock_s3():
+    """Start the shared Moto mock if needed and register one more user."""
+    global _MOCK_S3, _MOCK_USERS
+    with _S3_LOCK:
+        if _MOCK_S3 is None:
+            _MOCK_S3 = mock_aws()
+            _MOCK_S3.start()
+        _MOCK_USERS += 1
+        return _MOCK_S3
+
+
+def stop_mock_s3():
+    """Release one user of the shared Moto mock, stopping it after the last."""
+    global _MOCK_S3, _MOCK_USERS
+    with _S3_LOCK:
+        _MOCK_USERS -= 1
+        if _MOCK_USERS == 0:
+            _MOCK_S3.stop()
+            _MOCK_S3 = None
+            _MOCK_BUCKETS.clear()  # Mock data is gone with it
+
+
+def to_json_bytes(data):
+    """Serialize data to compact JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(levelname)s - %(message)s",
@@ -53,13 +117,12 @@ class S3Utils:
 
         if self.mock:
             logging.info("Using Moto mock S3 (no credentials required).")
-            self.mock_s3 = mock_aws()
-            self.mock_s3.start()
-            self.s3_client = boto3.client("s3", region_name="us-east-1")
+            self.mock_s3 = start_mock_s3()
+            self.s3_client = get_s3_client(mock=True)
             self._create_mock_bucket()
         else:
             logging.info("Running in AWS environment.")
-            self.s3_client = boto3.client("s3")  # Use IAM role, no profile
+            self.s3_client = get_s3_client(mock=False)
 
         logging.info(
             f"S3Utils initialized for bucket: {self.bucket_name} (mock={self.mock})"
@@ -67,10 +130,14 @@ class S3Utils:
 
     def _create_mock_bucket(self):
         """Ensure the S3 bucket is created when running locally in mock mode."""
+        if self.bucket_name in _MOCK_BUCKETS:
+            return
         try:
             self.s3_client.create_bucket(Bucket=self.bucket_name)
+            _MOCK_BUCKETS.add(self.bucket_name)
             logging.info(f"Mock S3 bucket '{self.bucket_name}' created successfully.")
         except self.s3_client.exceptions.BucketAlreadyOwnedByYou:
+            _MOCK_BUCKETS.add(self.bucket_name)
             logging.info(f"Mock S3 bucket '{self.bucket_name}' already exists.")
         except Exception as e:
             logging.error(f"Error creating mock S3 bucket: {e}")
@@ -78,7 +145,7 @@ class S3Utils:
     def upload_json_data(self, data, s3_key):
         """Upload data to S3 or mock S3 in test mode."""
         try:
-            json_data = json.dumps(data, indent=4)
+            json_data = to_json_bytes(data)
             self.s3_client.put_object(
                 Bucket=self.bucket_name,
                 Key=s3_key,
@@ -93,8 +160,9 @@ class S3Utils:
 
     def stop_mock(self):
         """Stop the Moto mock when the simulator exits."""
-        if self.mock:
-            self.mock_s3.stop()
+        if self.mock and self.mock_s3 is not None:
+            self.mock_s3 = None
+            stop_mock_s3()
 
 
 class DataSimulator:
@@ -129,10 +197,9 @@ class DataSimulator:
         logging.info(f"Uploaded data to S3: {file_name}")
         self.data_feed = []
 
-    def generate_data(self):
+    def generate_data(self, timestamp=None):
         """Generate random energy generation and consumption data."""
-        site_number = random.randint(1, 100)
-        site_id = f"SITECA{site_number:03d}"
+        site_id = random.choice(SITE_IDS)
         energy_generated = round(random.uniform(10, 200), 2)
         energy_consumed = round(random.uniform(1, energy_generated), 2)
 
@@ -144,34 +211,36 @@ class DataSimulator:
 
         return {
             "site_id": site_id,
-            "timestamp": int(datetime.now(timezone.utc).timestamp()),
+            "timestamp": (
+                timestamp
+                if timestamp is not None
+                else int(datetime.now(timezone.utc).timestamp())
+            ),
             "energy_generated_kwh": energy_generated,
             "energy_consumed_kwh": energy_consumed,
         }
 
-    def simulate_data(self, data_interval=20, context=None):
-        """Generate energy data every `data_interval` seconds and upload a single file before Lambda exits."""
+    def simulate_data(self, data_interval=20, context=None, sample_count=15):
+        """Generate `sample_count` readings `data_interval` seconds apart and upload them as a single file."""
+        # context is kept for existing callers, the run no longer waits so
+        # there is no Lambda timeout to watch
         self.data_feed = []
         logging.info("Simulation started.")
 
-        start_time = time.time()
+        # Backfill the readings for the window ending now instead of waiting
+        # out each interval, the schedule that invokes the Lambda sets cadence
+        end_time = int(datetime.now(timezone.utc).timestamp())
+        start_time = end_time - (sample_count - 1) * data_interval
 
-        while True:
-            if context:
-                remaining_time = context.get_remaining_time_in_millis() / 1000
-            else:
-                remaining_time = 300 - (time.time() - start_time)
-
-            if remaining_time < 15:  # Stop early to ensure data is saved
-                logging.info("Approaching timeout. Uploading data and exiting.")
+        for timestamp in range(start_time, end_time + 1, data_interval):
+            if self.stop_signal:
+                logging.info("Stop signal received. Uploading data and exiting.")
                 break
 
-            data = self.generate_data()
-            logging.info(f"Generated data: {data}")
+            data = self.generate_data(timestamp)
+            logging.debug("Generated data: %s", data)
             self.data_feed.append(data)
 
-            time.sleep(data_interval)
-
         self._store_data()
         logging.info("Lambda execution complete.")
 
@@ -179,7 +248,7 @@ class DataSimulator:
 def main(event=None, context=None, mock=USE_MOCK):
     """Entry point for lambda execution."""
     simulator = DataSimulator(mock=mock)
-    simulator.simulate_data(data_interval=20)
+    simulator.simulate_data(data_interval=20, sample_count=15)
 
 
 if __name__ == "__main__":
@@ -7,7 +7,7 @@ import os
 import signal
 import time
 from moto import mock_aws
-from src.simulator.data_simulator import DataSimulator, AWS_BUCKET_NAME
+from src.simulator.data_simulator import DataSimulator, S3Utils, AWS_BUCKET_NAME
 
 # Dummy AWS credentials for testing
 os.environ["AWS_ACCESS_KEY_ID"] = "test"
@@ -78,3 +78,77 @@ def test_simulator_handles_sigint(simulator_mock):
     simulator_thread.join()
 
     assert simulator_mock.stop_signal is True  # test if SIGINT was caught
+
+
+def test_simulate_data_uploads_sample_count(simulator_mock, monkeypatch):
+    """Test that one run uploads `sample_count` readings spaced by the interval."""
+    uploads = []
+    s3_utils = simulator_mock.s3_utils
+    upload_json_data = s3_utils.upload_json_data
+    monkeypatch.setattr(
+        s3_utils,
+        "upload_json_data",
+        lambda data, s3_key: uploads.append(s3_key) or upload_json_data(data, s3_key),
+    )
+
+    simulator_mock.simulate_data(data_interval=20, sample_count=15)
+
+    assert len(uploads) == 1
+    response = s3_utils.s3_client.get_object(Bucket=AWS_BUCKET_NAME, Key=uploads[0])
+    timestamps = [record["timestamp"] for record in json.loads(response["Body"].read())]
+    assert len(timestamps) == 15
+    assert all(b - a == 20 for a, b in zip(timestamps, timestamps[1:]))
+
+
+def test_simulator_uploads_partial_feed_on_sigint(simulator_mock, monkeypatch):
+    """Test if SIGINT mid-run stops generation and uploads what was collected."""
+    uploads = []
+    monkeypatch.setattr(
+        simulator_mock.s3_utils,
+        "upload_json_data",
+        lambda data, s3_key: uploads.append(list(data)) or True,
+    )
+
+    generate_data = simulator_mock.generate_data
+
+    def generate_then_interrupt(timestamp=None):
+        data = generate_data(timestamp)
+        if len(simulator_mock.data_feed) == 2:  # Interrupt on the third sample
+            signal.raise_signal(signal.SIGINT)
+        return data
+
+    monkeypatch.setattr(simulator_mock, "generate_data", generate_then_interrupt)
+
+    simulator_mock.simulate_data(data_interval=20, sample_count=15)
+
+    assert simulator_mock.stop_signal is True
+    assert len(uploads) == 1
+    assert len(uploads[0]) == 3
+
+
+def test_uploaded_data_round_trips(simulator_mock):
+    """Check if uploaded JSON parses back to the generated records."""
+    records = [simulator_mock.generate_data() for _ in range(3)]
+    assert simulator_mock.s3_utils.upload_json_data(records, "round_trip.json")
+
+    s3_client = simulator_mock.s3_utils.s3_client
+    response = s3_client.get_object(Bucket=AWS_BUCKET_NAME, Key="round_trip.json")
+
+    assert json.loads(response["Body"].read()) == records
+
+
+def test_stop_mock_keeps_mock_for_other_instances():
+    """Check if one S3Utils stopping its mock leaves others mocked."""
+    first = S3Utils(mock=True)
+    second = S3Utils(mock=True)
+
+    first.stop_mock()
+    first.stop_mock()  # A second stop must not release the other instance
+
+    assert second.upload_json_data([{"site_id": "SITECA001"}], "still_mocked.json")
+    response = second.s3_client.get_object(
+        Bucket=AWS_BUCKET_NAME, Key="still_mocked.json"
+    )
+    assert json.loads(response["Body"].read()) == [{"site_id": "SITECA001"}]
+
+    second.stop_mock()
@@ -1,10 +1,24 @@
 """Tests for s3 data processor Lambda."""
 
+import decimal
 import json
+import os
 import boto3
 import pytest
+from botocore.exceptions import ClientError
 from moto import mock_aws
-from src.processor.s3_data_processor import lambda_handler, process_s3_event
+
+# Dummy AWS credentials for testing, the Lambda's clients are created at import
+os.environ["AWS_ACCESS_KEY_ID"] = "test"
+os.environ["AWS_SECRET_ACCESS_KEY"] = "test"
+os.environ["AWS_SESSION_TOKEN"] = "test"
+
+from src.processor.s3_data_processor import (
+    format_record,
+    lambda_handler,
+    process_s3_event,
+    store_in_dynamodb,
+)
 
 
 @pytest.fixture(scope="function")
@@ -129,3 +143,147 @@ def test_lambda_handler(setup_mock_aws):
 
     assert len(items) == 1, f"Expected 1 record, found {len(items)}"
     assert items[0]["site_id"] == "SITE001"
+
+
+def test_lambda_handler_multiple_files(setup_mock_aws):
+    """Test that every file in a multi-record event is stored."""
+    s3_client, dynamodb, bucket_name, table_name = setup_mock_aws
+
+    test_event = {"Records": []}
+    for i in range(3):
+        test_data = [
+            {
+                "site_id": f"SITE00{i}",
+                "timestamp": 1708400000 + n,
+                "energy_generated_kwh": 120,
+                "energy_consumed_kwh": 90,
+            }
+            for n in range(2)
+        ]
+        file_key = f"event_data_{i}.json"
+        s3_client.put_object(
+            Bucket=bucket_name, Key=file_key, Body=json.dumps(test_data)
+        )
+        test_event["Records"].append(
+            {"s3": {"bucket": {"name": bucket_name}, "object": {"key": file_key}}}
+        )
+
+    # A repeated notification for a file already in the event
+    test_event["Records"].append(test_event["Records"][0])
+
+    lambda_handler(test_event, None)
+
+    table = dynamodb.Table(table_name)
+    items = table.scan()["Items"]
+
+    assert len(items) == 6, f"Expected 6 records, found {len(items)}"
+    assert {item["site_id"] for item in items} == {"SITE000", "SITE001", "SITE002"}
+
+
+def test_lambda_handler_later_file_wins(setup_mock_aws):
+    """Test that the later file in an event wins on a duplicate key."""
+    s3_client, dynamodb, bucket_name, table_name = setup_mock_aws
+
+    test_event = {"Records": []}
+    for i, generated in enumerate([120, 130, 140]):
+        test_data = [
+            {
+                "site_id": "SITE001",
+                "timestamp": 1708400000,
+                "energy_generated_kwh": generated,
+                "energy_consumed_kwh": 90,
+            }
+        ]
+        file_key = f"overlap_data_{i}.json"
+        s3_client.put_object(
+            Bucket=bucket_name, Key=file_key, Body=json.dumps(test_data)
+        )
+        test_event["Records"].append(
+            {"s3": {"bucket": {"name": bucket_name}, "object": {"key": file_key}}}
+        )
+
+    lambda_handler(test_event, None)
+
+    table = dynamodb.Table(table_name)
+    items = table.scan()["Items"]
+
+    assert len(items) == 1, f"Expected 1 record, found {len(items)}"
+    assert items[0]["energy_generated_kwh"] == 140
+
+
+def test_process_s3_event_duplicate_records(setup_mock_aws):
+    """Test that duplicate keys in one file are batched without errors."""
+    s3_client, dynamodb, bucket_name, table_name = setup_mock_aws
+
+    # Same site_id and timestamp twice, the last record should win
+    test_data = [
+        {
+            "site_id": "SITE001",
+            "timestamp": 1708400000,
+            "energy_generated_kwh": 120,
+            "energy_consumed_kwh": 90,
+        },
+        {
+            "site_id": "SITE001",
+            "timestamp": 1708400000,
+            "energy_generated_kwh": 130,
+            "energy_consumed_kwh": 95,
+        },
+    ]
+    file_key = "duplicate_data.json"
+    s3_client.put_object(Bucket=bucket_name, Key=file_key, Body=json.dumps(test_data))
+
+    process_s3_event(bucket_name, file_key)
+
+    table = dynamodb.Table(table_name)
+    items = table.scan()["Items"]
+
+    assert len(items) == 1, f"Expected 1 record, found {len(items)}"
+    assert items[0]["energy_generated_kwh"] == 130
+
+
+def test_format_record():
+    """Test DynamoDB item formatting and anomaly detection."""
+    item = format_record(
+        {
+            "site_id": "SITE001",
+            "timestamp": 1708400000,
+            "energy_generated_kwh": 120.45,
+            "energy_consumed_kwh": 143.01,
+        }
+    )
+
+    assert item["energy_generated_kwh"] == decimal.Decimal("120.45")
+    assert item["energy_consumed_kwh"] == decimal.Decimal("143.01")
+    assert item["net_energy_kwh"] == decimal.Decimal("-22.56")
+    assert item["anomaly"] is False
+
+    anomaly = format_record(
+        {
+            "site_id": "SITE001",
+            "timestamp": 1708400000,
+            "energy_generated_kwh": -1.5,
+            "energy_consumed_kwh": 10,
+        }
+    )
+    assert anomaly["anomaly"] is True
+
+
+def test_store_in_dynamodb_reports_failed_put():
+    """Test that a failed batch put is reported rather than counted as stored."""
+
+    class FailingBatch:
+        def put_item(self, Item):
+            raise ClientError(
+                {"Error": {"Code": "ValidationException", "Message": "failed"}},
+                "BatchWriteItem",
+            )
+
+    record = {
+        "site_id": "SITE001",
+        "timestamp": 1708400000,
+        "energy_generated_kwh": 120,
+        "energy_consumed_kwh": 90,
+    }
+
+    assert store_in_dynamodb(FailingBatch(), record, "failed.json") is False